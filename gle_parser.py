@@ -1,61 +1,88 @@
 # gle_parser.py
 import re
-import json
-from lexer import lex
+from lexer import lex, EOF
 from exceptions import ParseError
 from phase1 import Phase1Parser
 from phase2 import Phase2Parser
 from phase3 import Phase3Parser
+from bisect import bisect_right
 
 
+# More tolerant function header pattern
+HEADER_RE = re.compile(
+    r'\b([A-Za-z_][\w\s\*\&<>:]*)\s+'     # return type
+    r'([A-Za-z_]\w*)\s*'                  # function name
+    r'\((.*?)\)\s*'                        # parameters
+    r'\{',                                 # opening brace
+    re.DOTALL
+)
 
-def extract_function_blocks(code):
+# Simple "type name [= value];" declaration at the start of a line
+DECL_RE = re.compile(
+    r'^[^\S\n]*([A-Za-z_][\w<>]*)[^\S\n]+([A-Za-z_]\w*)[^\S\n]*(?:=[^;\n]*)?;',
+    re.MULTILINE
+)
+
+BRACE_RE = re.compile(r'[{}]')
+
+
+def match_braces(code):
+    """
+    Map the offset of every '{' in code to the offset just past its
+    matching '}'. Stray '}' are ignored and unclosed '{' are left out.
     """
-    Extract functions reliably, even with indentation, comments, or line breaks.
-    Returns: list of {name, params_text, body_text, start_line, end_line}
+    closing = {}
+    stack = []
+    for m in BRACE_RE.finditer(code):
+        i = m.start()
+        if code[i] == "{":
+            stack.append(i)
+        elif stack:
+            closing[stack.pop()] = i + 1
+    return closing
+
+
+def compute_line_starts(text):
     """
+    Offsets at which each line of text begins.
+    """
+    return [0] + [m.end() for m in re.finditer("\n", text)]
 
-    # More tolerant function header pattern
-    header_re = re.compile(
-        r'\b([A-Za-z_][\w\s\*\&<>:]*)\s+'     # return type
-        r'([A-Za-z_]\w*)\s*'                  # function name
-        r'\((.*?)\)\s*'                        # parameters
-        r'\{',                                 # opening brace
-        re.DOTALL
-    )
 
-    funcs = []
+def line_text(text, line_starts, index):
+    """
+    Stripped text of the line with the given 0-based index.
+    """
+    start = line_starts[index]
+    end = line_starts[index + 1] - 1 if index + 1 < len(line_starts) else len(text)
+    return text[start:end].strip()
 
-    for m in header_re.finditer(code):
-        name = m.group(2)
-        params_txt = m.group(3).strip()
 
-        # Find matching closing brace
+def iter_functions(code, line_starts):
+    """
+    Find functions reliably, even with indentation, comments, or line breaks.
+    Each one is yielded as a finished Function node; no intermediate
+    list of body copies is kept.
+    """
+    n = len(code)
+    closing = match_braces(code)
+
+    for m in HEADER_RE.finditer(code):
+        # Jump past the matching closing brace, or to the end if unclosed
         brace_start = m.end() - 1
-        depth = 1
-        pos = brace_start + 1
-
-        while pos < len(code) and depth > 0:
-            if code[pos] == "{":
-                depth += 1
-            elif code[pos] == "}":
-                depth -= 1
-            pos += 1
-
-        body = code[brace_start + 1 : pos - 1]
-
-        start_line = code[:m.start()].count("\n") + 1
-        end_line = code[:pos].count("\n") + 1
-
-        funcs.append({
-            "name": name,
-            "params_text": params_txt,
-            "body_text": body,
-            "start_line": start_line,
-            "end_line": end_line
-        })
+        pos = closing.get(brace_start, n)
+
+        locals_, expressions = extract_body(code[brace_start + 1 : pos - 1])
 
-    return funcs
+        yield {
+            "type": "Function",
+            "name": m.group(2),
+            "params": parse_parameters(m.group(3).strip()),
+            "locals": locals_,
+            "expressions": expressions,
+            "start_line": bisect_right(line_starts, m.start()),
+            "end_line": bisect_right(line_starts, pos)
+        }
 
 
 def parse_parameters(params_text):
@@ -71,42 +98,27 @@ def parse_parameters(params_text):
         params.append({"type": ptype, "name": pname})
     return params
 
-def extract_local_declarations(body_text):
+def extract_body(body_text):
     """
-    Extract simple local declarations inside a function.
+    Extract simple local declarations and expressions (assignments,
+    function calls, returns) from a function body in a single pass.
+    Returns: (locals, expressions)
     """
     decls = []
-    decl_re = re.compile(r'\b([A-Za-z_][\w<>]*)\s+([A-Za-z_]\w*)\s*(=.*)?;')
+    exprs = []
 
-    for line in body_text.split("\n"):
+    for i, line in enumerate(body_text.split("\n"), start=1):
         stripped = line.strip()
         if not stripped:
             continue
 
-        m = decl_re.match(stripped)
+        m = DECL_RE.match(stripped)
         if m:
             decls.append({
                 "type": m.group(1),
                 "name": m.group(2),
                 "line": stripped
             })
-
-    return decls
-
-
-def extract_expressions(body_text):
-    """
-    Extract expressions such as assignments, function calls, returns.
-    """
-    exprs = []
-
-    for i, line in enumerate(body_text.split("\n"), start=1):
-        stripped = line.strip()
-        if not stripped:
-            continue
-
-        # Skip declarations
-        if re.match(r'\b[A-Za-z_][\w<>]*\s+[A-Za-z_]\w*\s*(=.*)?;', stripped):
             continue
 
         # Anything else ending with ; is an expression
@@ -116,46 +128,97 @@ def extract_expressions(body_text):
                 "lineno": i
             })
 
-    return exprs
+    return decls, exprs
 
 
-def find_global_declarations(code, function_blocks):
+def mark_function_lines(functions, line_count):
     """
-    Identify global declarations only outside function ranges.
+    Mark lines that are inside functions so global scans can skip them.
     """
-    globals_list = []
-    lines = code.split("\n")
-
-    # Mark lines that are inside functions so we can skip them
-    inside_func = [False] * len(lines)
+    inside_func = bytearray(line_count)
 
-    for f in function_blocks:
+    for f in functions:
         start = f["start_line"] - 1
-        end = f["end_line"] - 1
-        for i in range(start, end + 1):
-            inside_func[i] = True
+        end = f["end_line"]
+        inside_func[start:end] = b"\x01" * (end - start)
 
-    decl_re = re.compile(r'\b([A-Za-z_][\w<>]*)\s+([A-Za-z_]\w*)\s*(=.*)?;')
+    return inside_func
 
-    for i, line in enumerate(lines):
-        if inside_func[i]:
-            continue
 
-        stripped = line.strip()
-        if not stripped or stripped.startswith("#"):
+def find_global_declarations(code, line_starts, inside_func):
+    """
+    Identify global declarations only outside function ranges.
+    """
+    globals_list = []
+
+    for m in DECL_RE.finditer(code):
+        i = bisect_right(line_starts, m.start()) - 1
+        if inside_func[i]:
             continue
 
-        m = decl_re.match(stripped)
-        if m:
-            globals_list.append({
-                "type": m.group(1),
-                "name": m.group(2),
-                "line": stripped
-            })
+        globals_list.append({
+            "type": m.group(1),
+            "name": m.group(2),
+            "line": line_text(code, line_starts, i)
+        })
 
     return globals_list
 
 
+class FusedParser:
+    """
+    Run the three phase parsers over the token stream in one walk.
+    Each round advances every phase by one function, so a function's
+    tokens are visited by all phases back to back instead of in three
+    full passes. The phases still need their own positions: Phase 1
+    accepts parameter lists that Phases 2 and 3 reject.
+
+    Each phase's diagnostics go to its own list. A phase stops at its
+    first error, and the phases after it are dropped, since they can no
+    longer decide the result.
+    """
+
+    def __init__(self, tokens):
+        self.errors_global = []
+        self.errors_local = []
+        self.errors_expr = []
+        self.phases = [
+            (Phase1Parser(tokens), self.errors_global),
+            (Phase2Parser(tokens), self.errors_local),
+            (Phase3Parser(tokens), self.errors_expr),
+        ]
+
+    def parse(self):
+        active = self.phases
+        while True:
+            active = [entry for entry in active if entry[0].kind != EOF]
+            if not active:
+                break
+            for i, (parser, errors) in enumerate(active):
+                try:
+                    parser.parse_function()
+                except Exception as e:
+                    errors.append(e)
+                    del active[i:]
+                    break
+
+    def first_error(self):
+        # Sequential precedence: GLOBAL, then LOCAL, then EXPRESSION
+        for errors in (self.errors_global, self.errors_local, self.errors_expr):
+            if errors:
+                return errors[0]
+        return None
+
+
+def run_phases(tokens):
+    """Parse with all three phases and raise the error that wins."""
+    fused = FusedParser(tokens)
+    fused.parse()
+    error = fused.first_error()
+    if error is not None:
+        raise error
+
+
 def run_gle(code: str):
     """
     Runs the 3-phase parser for real error detection
@@ -169,9 +232,7 @@ def run_gle(code: str):
     # ============================================================
     try:
         tokens = lex(code)                     # LEXICAL ANALYSIS
-        Phase1Parser(tokens).parse()           # GLOBAL + BLOCK STRUCTURE
-        Phase2Parser(tokens).parse()           # STATEMENTS + SEMICOLONS
-        Phase3Parser(tokens).parse()           # EXPRESSIONS
+        run_phases(tokens)                     # GLOBAL + LOCAL + EXPRESSION
         parser_error = None                    # No error found
 
     except ParseError as e:
@@ -190,28 +251,15 @@ def run_gle(code: str):
     # 🌟 2) YOUR ORIGINAL AST GENERATION (UNCHANGED)
     # ============================================================
     try:
-        functions = extract_function_blocks(code)
-        globals_found = find_global_declarations(code, functions)
-
-        ast = {"type": "Program", "globals": [], "functions": []}
-
-        for g in globals_found:
-            ast["globals"].append(g)
-
-        for f in functions:
-            params = parse_parameters(f["params_text"])
-            locals_ = extract_local_declarations(f["body_text"])
-            expressions = extract_expressions(f["body_text"])
-
-            ast["functions"].append({
-                "type": "Function",
-                "name": f["name"],
-                "params": params,
-                "locals": locals_,
-                "expressions": expressions,
-                "start_line": f["start_line"],
-                "end_line": f["end_line"]
-            })
+        line_starts = compute_line_starts(code)
+        functions = list(iter_functions(code, line_starts))
+        inside_func = mark_function_lines(functions, len(line_starts))
+
+        ast = {
+            "type": "Program",
+            "globals": find_global_declarations(code, line_starts, inside_func),
+            "functions": functions
+        }
 
     except Exception as e:
         # AST error → return empty AST but keep parser error
@@ -1,59 +1,189 @@
 # lexer.py
 
 import re
-from dataclasses import dataclass
+from enum import IntEnum
+from sys import intern
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from exceptions import ParseError
 
-@dataclass
 class Token:
-    type: str
-    value: str
-    line: int
-    column: int
+    __slots__ = ("type", "value", "line", "column")
 
-KEYWORDS = {"int", "if", "else", "while", "return"}
+    def __init__(self, type, value, line, column):
+        self.type = type
+        self.value = value
+        self.line = line
+        self.column = column
 
+    def __repr__(self):
+        return (f"Token(type={self.type!r}, value={self.value!r}, "
+                f"line={self.line}, column={self.column})")
+
+# Token kinds, stored one byte per token in Tokens.types. OP is only
+# the lexer's operator class; each operator is emitted as its own kind.
+(EOF, NUMBER, ID, STRING, OP, LPAREN, RPAREN, LBRACE, RBRACE, SEMICOL,
+ COMMA, SKIP, INT, IF, ELSE, WHILE, RETURN,
+ EQ, NEQ, LT, LE, GT, GE, PLUS, MINUS, STAR, SLASH, ASSIGN) = range(28)
+
+TYPE_NAMES = ("EOF", "NUMBER", "ID", "STRING", "OP", "LPAREN", "RPAREN",
+              "LBRACE", "RBRACE", "SEMICOL", "COMMA", "SKIP",
+              "INT", "IF", "ELSE", "WHILE", "RETURN",
+              "EQ", "NEQ", "LT", "LE", "GT", "GE",
+              "PLUS", "MINUS", "STAR", "SLASH", "ASSIGN")
+
+KIND = {name: kind for kind, name in enumerate(TYPE_NAMES)}
+
+# Named view of the kinds for debugging and outside callers; the lexer
+# and parsers compare against the plain int constants above.
+TokenKind = IntEnum("TokenKind", TYPE_NAMES, start=0)
+
+KEYWORDS = {"int": INT, "if": IF, "else": ELSE, "while": WHILE, "return": RETURN}
+
+# Operator text -> (kind, interned text)
+OPERATORS = {
+    text: (kind, intern(text)) for text, kind in (
+        ("==", EQ), ("!=", NEQ), ("<", LT), ("<=", LE), (">", GT), (">=", GE),
+        ("+", PLUS), ("-", MINUS), ("*", STAR), ("/", SLASH), ("=", ASSIGN),
+    )
+}
+
+# Most frequent classes first; MISMATCH stays last as the fallback.
+# Within OP the common operators are tried before the rare "!=".
 TOKEN_SPEC = [
-    ("NUMBER",   r'\d+'),
     ("ID",       r'[A-Za-z_]\w*'),
-    ("STRING",   r'"[^"\n]*"'),
-    ("OP",       r'==|!=|<=|>=|\+|-|\*|/|<|>|='),
+    ("OP",       r'[=<>]=?|[+\-*/]|!='),
+    ("SKIP",     r'[\r\n][ \t\r\n]*|\Z'),
+    ("SEMICOL",  r';'),
     ("LPAREN",   r'\('),
     ("RPAREN",   r'\)'),
     ("LBRACE",   r'\{'),
     ("RBRACE",   r'\}'),
-    ("SEMICOL",  r';'),
+    ("NUMBER",   r'\d+'),
+    ("STRING",   r'"[^"\n]*"'),
     ("COMMA",    r','),
-    ("NEWLINE",  r'\n'),
-    ("SKIP",     r'[ \t\r]+'),
     ("MISMATCH", r'.'),
 ]
 
-master_pat = re.compile("|".join(
-    f"(?P<{name}>{pattern})" for name, pattern in TOKEN_SPEC
-))
+# One alternation of every class, each in its own group. The engine
+# picks the class and m.lastindex maps it back to a kind. Blanks before
+# a token are absorbed by the leading [ \t]*, so SKIP only has to match
+# line breaks (and the end of input, which ends trailing blanks).
+MASTER_RE = re.compile(
+    r"[ \t]*(?:" + "|".join(f"({pattern})" for _, pattern in TOKEN_SPEC) + ")")
+
+# GROUP_KIND[m.lastindex] -> kind, None for MISMATCH
+GROUP_KIND = (None,) + tuple(KIND.get(name) for name, _ in TOKEN_SPEC)
+
+
+# Matches any brace or parenthesis kind in a Tokens.types bytearray
+BRACKETS_RE = re.compile(b"[%c%c%c%c]" % (LPAREN, RPAREN, LBRACE, RBRACE))
+
+
+def line_col(offsets, line_starts, i):
+    """
+    1-based (line, column) of token i, found by binary search over the
+    line start offsets. Only needed when a position is reported.
+    """
+    offset = offsets[i]
+    line = bisect_right(line_starts, offset)
+    return line, offset - line_starts[line - 1] + 1
+
+
+def match_brackets(types, offsets, line_starts):
+    """
+    Map the index of every '{' to the index of its '}', checking that
+    braces and parentheses balance. Only bracket tokens are visited;
+    the scan between them runs inside the regex engine.
+    """
+    brace_match = {}
+    braces = []
+    parens = []
+
+    for m in BRACKETS_RE.finditer(types):
+        i = m.start()
+        kind = types[i]
+        if kind == LBRACE:
+            braces.append(i)
+        elif kind == LPAREN:
+            parens.append(i)
+        elif kind == RBRACE:
+            if not braces:
+                raise ParseError("Unbalanced '}' without a matching '{'.",
+                                 *line_col(offsets, line_starts, i), "LEXICAL")
+            brace_match[braces.pop()] = i
+        else:
+            if not parens:
+                raise ParseError("Unbalanced ')' without a matching '('.",
+                                 *line_col(offsets, line_starts, i), "LEXICAL")
+            parens.pop()
+
+    if braces or parens:
+        # Report the innermost bracket left open
+        i = max(braces[-1:] + parens[-1:])
+        line, column = line_col(offsets, line_starts, i)
+        if types[i] == LBRACE:
+            raise ParseError("Unbalanced '{' is never closed.",
+                             line, column, "LEXICAL",
+                             "Add the missing '}'.")
+        raise ParseError("Unbalanced '(' is never closed.",
+                         line, column, "LEXICAL",
+                         "Add the missing ')'.")
+
+    return brace_match
+
+
+class Tokens(namedtuple("Tokens", "types values offsets line_starts brace_match")):
+    """
+    Token stream as parallel arrays: kinds in a bytearray, source text
+    in a list, start offsets in an int array. Line and column are
+    derived from line_starts only when asked for. brace_match maps each
+    '{' to its closing '}' so parsers can jump over blocks.
+    """
+    __slots__ = ()
+
+    def position(self, i):
+        return line_col(self.offsets, self.line_starts, i)
+
+    def token(self, i):
+        return Token(TYPE_NAMES[self.types[i]], self.values[i], *self.position(i))
+
 
 def lex(code: str):
-    tokens = []
-    line = 1
-    line_start = 0
-
-    for mo in master_pat.finditer(code):
-        kind = mo.lastgroup
-        value = mo.group()
-        col = mo.start() - line_start + 1
-
-        if kind == "NEWLINE":
-            line += 1
-            line_start = mo.end()
-            continue
-        if kind == "SKIP":
+    types = bytearray()
+    values = []
+    offsets = array("i")
+    line_starts = array("i", [0])
+
+    for m in MASTER_RE.finditer(code):
+        group = m.lastindex
+        kind = GROUP_KIND[group]
+        if kind == SKIP:
+            # Newlines only ever appear inside whitespace runs
+            start, end = m.span()
+            nl = code.find("\n", start, end)
+            while nl != -1:
+                line_starts.append(nl + 1)
+                nl = code.find("\n", nl + 1, end)
             continue
-        if kind == "ID" and value in KEYWORDS:
-            tokens.append(Token(value.upper(), value, line, col))
-        elif kind == "MISMATCH":
-            raise Exception(f"Unexpected character {value} at line {line}")
-        else:
-            tokens.append(Token(kind, value, line, col))
+        if kind is None:
+            raise Exception(f"Unexpected character {m[group]} "
+                            f"at line {len(line_starts)}")
+
+        value = m[group]
+        if kind == ID:
+            kind = KEYWORDS.get(value, ID)
+            value = intern(value)
+        elif kind == OP:
+            kind, value = OPERATORS[value]
+        types.append(kind)
+        values.append(value)
+        offsets.append(m.start(group))
 
-    tokens.append(Token("EOF", "", line, 1))
-    return tokens
+    # EOF sits at column 1 of the last line
+    types.append(EOF)
+    values.append("")
+    offsets.append(line_starts[-1])
+    return Tokens(types, values, offsets, line_starts,
+                  match_brackets(types, offsets, line_starts))
@@ -1,29 +1,71 @@
 # parser_base.py
 
+from exceptions import ParseError
+from lexer import TYPE_NAMES
+
 class ParserBase:
+    # Fixed attribute layout: fields are read through slot descriptors
+    # instead of a per-instance dict
+    __slots__ = ("tokens", "types", "values", "brace_match", "last", "pos", "kind")
+
     def __init__(self, tokens):
         self.tokens = tokens
+        self.types = tokens.types
+        self.values = tokens.values
+        self.brace_match = tokens.brace_match
+        self.last = len(self.types) - 1
         self.pos = 0
+        self.kind = self.types[0]
 
     @property
     def current(self):
-        return self.tokens[self.pos]
+        # Token view for legacy call sites; hot paths read self.kind
+        return self.tokens.token(self.pos)
 
     def advance(self):
-        tok = self.current
-        if self.pos < len(self.tokens) - 1:
-            self.pos += 1
-        return tok
+        pos = self.pos
+        if pos < self.last:
+            self.pos = pos + 1
+            self.kind = self.types[pos + 1]
+        return pos
+
+    def seek(self, pos):
+        self.pos = pos
+        self.kind = self.types[pos]
 
-    def match(self, *types):
-        if self.current.type in types:
+    def skip_until(self, kind):
+        # EOF is always the last token, so a miss lands on it
+        pos = self.types.find(kind, self.pos)
+        self.seek(pos if pos != -1 else self.last)
+
+    def match(self, kind):
+        if self.kind == kind:
             self.advance()
             return True
         return False
 
-    def expect(self, ttype, phase, message, hint=None):
-        if self.current.type == ttype:
+    def expect(self, kind, phase, message, hint=None):
+        if self.kind == kind:
             return self.advance()
-        from exceptions import ParseError
-        raise ParseError(message, self.current.line,
-                         self.current.column, phase, hint)
+        raise self.error(message, phase, hint)
+
+    def error(self, message, phase, hint=None, pos=None):
+        if pos is None:
+            pos = self.pos
+        line, column = self.tokens.position(pos)
+        return ParseError(message, line, column, phase, hint)
+
+
+def _make_expect(kind):
+    # expect() with the token kind baked in as a closure constant
+    def expect_kind(self, phase, message, hint=None):
+        if self.kind == kind:
+            return self.advance()
+        raise self.error(message, phase, hint)
+    expect_kind.__name__ = expect_kind.__qualname__ = "expect_" + TYPE_NAMES[kind]
+    return expect_kind
+
+# ParserBase.expect_INT, expect_LPAREN, ... one per token kind
+for _kind, _name in enumerate(TYPE_NAMES):
+    setattr(ParserBase, "expect_" + _name, _make_expect(_kind))
+del _kind, _name
@@ -1,81 +1,58 @@
-from lexer import Token
-from exceptions import ParseError
+from lexer import EOF, ID, LPAREN, RPAREN, LBRACE
 from parser_base import ParserBase
 
 class Phase1Parser(ParserBase):
     PHASE = "GLOBAL"
+    __slots__ = ()
 
     def parse(self):
-        while self.current.type != "EOF":
+        while self.kind != EOF:
             self.parse_function()
 
     def parse_function(self):
         # ------------------------
         # 1. Parse return type
         # ------------------------
-        self.expect("INT", self.PHASE, "Expected 'int' at function start.")
-
-        # Allow newline/space before function name
-        while self.current.type in ("SKIP", "NEWLINE"):
-            self.advance()
+        self.expect_INT(self.PHASE, "Expected 'int' at function start.")
 
         # ------------------------
         # 2. Parse function name
         # ------------------------
-        if self.current.type != "ID":
-            raise ParseError("Expected function name.",
-                             self.current.line, self.current.column, self.PHASE)
+        if self.kind != ID:
+            raise self.error("Expected function name.", self.PHASE)
 
         self.advance()  # consume function name
 
-        # Allow whitespace before '('
-        while self.current.type in ("SKIP", "NEWLINE"):
-            self.advance()
-
         # ------------------------
         # 3. Opening Parenthesis
         # ------------------------
-        if self.current.type != "LPAREN":
-            raise ParseError("Expected '(' after function name.",
-                             self.current.line, self.current.column, self.PHASE)
+        if self.kind != LPAREN:
+            raise self.error("Expected '(' after function name.", self.PHASE)
         self.advance()
 
         # ------------------------
         # 4. Parse params (we ignore content)
         # ------------------------
-        while self.current.type not in ("RPAREN", "EOF"):
-            self.advance()
+        self.skip_until(RPAREN)
 
-        if self.current.type != "RPAREN":
-            raise ParseError("Expected ')' after '('.",
-                             self.current.line, self.current.column, self.PHASE)
+        if self.kind != RPAREN:
+            raise self.error("Expected ')' after '('.", self.PHASE)
         self.advance()
 
-        # Allow whitespace before '{'
-        while self.current.type in ("SKIP", "NEWLINE"):
-            self.advance()
-
         # ------------------------
         # 5. Opening brace {
         # ------------------------
-        if self.current.type != "LBRACE":
-            raise ParseError("Expected '{' to start function body.",
-                             self.current.line, self.current.column, self.PHASE)
+        if self.kind != LBRACE:
+            raise self.error("Expected '{' to start function body.", self.PHASE)
 
-        lbrace = self.current
-        self.advance()
+        lbrace = self.advance()
 
         # ------------------------
-        # 6. Scan until matching }
+        # 6. Jump past matching }
         # ------------------------
-        depth = 1
-        while depth > 0 and self.current.type != "EOF":
-            if self.current.type == "LBRACE":
-                depth += 1
-            elif self.current.type == "RBRACE":
-                depth -= 1
-            self.advance()
-
-        if depth != 0:
-            raise ParseError("Missing closing '}' for function.",
-                             lbrace.line, lbrace.column, self.PHASE)
+        end = self.brace_match.get(lbrace)
+        if end is None:
+            self.seek(self.last)
+            raise self.error("Missing closing '}' for function.",
+                             self.PHASE, pos=lbrace)
+        self.seek(end + 1)
@@ -1,152 +1,201 @@
 # phase3.py
 
+from array import array
+from lexer import (EOF, NUMBER, ID, LPAREN, LBRACE, RBRACE,
+                   SEMICOL, IF, ELSE, WHILE, RETURN,
+                   EQ, NEQ, LT, LE, GT, GE, PLUS, MINUS, STAR, SLASH,
+                   TYPE_NAMES)
 from parser_base import ParserBase
-from exceptions import ParseError
+
+# Binding power of each binary operator kind, 0 for everything else
+PRECEDENCE = {EQ: 1, NEQ: 1, LT: 2, GT: 2, LE: 2, GE: 2,
+              PLUS: 3, MINUS: 3, STAR: 4, SLASH: 4}
+BINARY_PREC = tuple(PRECEDENCE.get(kind, 0) for kind in range(len(TYPE_NAMES)))
+
+# Prefix operators bind tighter than any binary operator
+UNARY_PREC = 5
+
+# Stack marker for an open '('
+PAREN = (0, None)
+
+# AST node tags, stored one byte per node in Phase3Parser.ast_tags
+NODE_NUM, NODE_ID, NODE_UNARY, NODE_BINOP = range(4)
 
 class Phase3Parser(ParserBase):
     PHASE = "EXPRESSION"
+    __slots__ = ("ast_tags", "ast_ops", "ast_lhs", "ast_rhs", "_expr_memo")
+
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        # Expression nodes as parallel arrays; a node is its index. ast_ops
+        # holds the operator or leaf text, ast_lhs/ast_rhs the child
+        # indices (-1 when absent).
+        self.ast_tags = bytearray()
+        self.ast_ops = []
+        self.ast_lhs = array("i")
+        self.ast_rhs = array("i")
+        # Start position -> (node, end position) for the current function
+        self._expr_memo = {}
 
     def parse(self):
-        while self.current.type != "EOF":
+        while self.kind != EOF:
             self.parse_function()
 
     def parse_function(self):
-        self.expect("INT", self.PHASE, "Expected 'int' at start of function.")
-        self.expect("ID", self.PHASE, "Expected function name.")
-        self.expect("LPAREN", self.PHASE, "Expected '(' after function name.")
-        self.expect("RPAREN", self.PHASE, "Expected ')' after '('.")
+        # Positions and node ids never outlive a function; drop the old trees
+        self._expr_memo = {}
+        del self.ast_tags[:], self.ast_ops[:], self.ast_lhs[:], self.ast_rhs[:]
+        self.expect_INT(self.PHASE, "Expected 'int' at start of function.")
+        self.expect_ID(self.PHASE, "Expected function name.")
+        self.expect_LPAREN(self.PHASE, "Expected '(' after function name.")
+        self.expect_RPAREN(self.PHASE, "Expected ')' after '('.")
         self.parse_block()
 
     def parse_block(self):
-        self.expect("LBRACE", self.PHASE, "Expected '{' to start block.")
-        while self.current.type not in ("RBRACE", "EOF"):
+        self.expect_LBRACE(self.PHASE, "Expected '{' to start block.")
+        kind = self.kind
+        while kind != RBRACE and kind != EOF:
             self.parse_statement()
-        self.expect("RBRACE", self.PHASE, "Expected '}' to close block.")
+            kind = self.kind
+        self.expect_RBRACE(self.PHASE, "Expected '}' to close block.")
 
     # -----------------------------
     # STATEMENTS
     # -----------------------------
     def parse_statement(self):
-        if self.current.type == "IF":
+        kind = self.kind
+        if kind == IF:
             self.parse_if()
-        elif self.current.type == "WHILE":
+        elif kind == WHILE:
             self.parse_while()
-        elif self.current.type == "RETURN":
+        elif kind == RETURN:
             self.parse_return()
-        elif self.current.type == "LBRACE":
+        elif kind == LBRACE:
             self.parse_block()
         else:
-            if self.current.type != "SEMICOL":
+            if kind != SEMICOL:
                 self.parse_expression()
-            self.expect("SEMICOL", self.PHASE,
-                        "Missing ';' after statement.",
-                        "End statements with ';'.")
+            self.expect_SEMICOL(self.PHASE,
+                                "Missing ';' after statement.",
+                                "End statements with ';'.")
 
     def parse_if(self):
         if_tok = self.advance()
-        self.expect("LPAREN", self.PHASE, "Expected '(' after if.")
+        self.expect_LPAREN(self.PHASE, "Expected '(' after if.")
         self.parse_expression()
-        self.expect("RPAREN", self.PHASE, "Expected ')' after if condition.")
-        if self.current.type != "LBRACE":
-            raise ParseError("Expected '{' after if condition.",
-                             self.current.line, self.current.column, self.PHASE)
+        self.expect_RPAREN(self.PHASE, "Expected ')' after if condition.")
+        if self.kind != LBRACE:
+            raise self.error("Expected '{' after if condition.", self.PHASE)
         self.parse_block()
 
-        if self.current.type == "ELSE":
+        if self.kind == ELSE:
             self.advance()
-            if self.current.type == "IF":
+            if self.kind == IF:
                 self.parse_if()
             else:
-                if self.current.type != "LBRACE":
-                    raise ParseError("Expected '{' after else.",
-                                     self.current.line, self.current.column, self.PHASE)
+                if self.kind != LBRACE:
+                    raise self.error("Expected '{' after else.", self.PHASE)
                 self.parse_block()
 
     def parse_while(self):
         while_tok = self.advance()
-        self.expect("LPAREN", self.PHASE, "Expected '(' after while.")
+        self.expect_LPAREN(self.PHASE, "Expected '(' after while.")
         self.parse_expression()
-        self.expect("RPAREN", self.PHASE, "Expected ')' after while condition.")
-        if self.current.type != "LBRACE":
-            raise ParseError("Expected '{' after while condition.",
-                             self.current.line, self.current.column, self.PHASE)
+        self.expect_RPAREN(self.PHASE, "Expected ')' after while condition.")
+        if self.kind != LBRACE:
+            raise self.error("Expected '{' after while condition.", self.PHASE)
         self.parse_block()
 
     def parse_return(self):
         ret = self.advance()
-        if self.current.type == "SEMICOL":
+        if self.kind == SEMICOL:
             self.advance()
         else:
             self.parse_expression()
-            self.expect("SEMICOL", self.PHASE,
-                        "Missing ';' after return value.")
+            self.expect_SEMICOL(self.PHASE,
+                                "Missing ';' after return value.")
 
     # -----------------------------
     # EXPRESSIONS
     # -----------------------------
-    def parse_expression(self):
-        return self.parse_equality()
-
-    def parse_equality(self):
-        node = self.parse_comparison()
-        while self.current.type == "OP" and self.current.value in ("==", "!="):
-            op = self.advance()
-            right = self.parse_comparison()
-            node = ("binop", op.value, node, right)
-        return node
+    def new_node(self, tag, text, lhs=-1, rhs=-1):
+        self.ast_tags.append(tag)
+        self.ast_ops.append(text)
+        self.ast_lhs.append(lhs)
+        self.ast_rhs.append(rhs)
+        return len(self.ast_tags) - 1
 
-    def parse_comparison(self):
-        node = self.parse_term()
-        while self.current.type == "OP" and self.current.value in ("<", ">", "<=", ">="):
-            op = self.advance()
-            right = self.parse_term()
-            node = ("binop", op.value, node, right)
-        return node
-
-    def parse_term(self):
-        node = self.parse_factor()
-        while self.current.type == "OP" and self.current.value in ("+", "-"):
-            op = self.advance()
-            right = self.parse_factor()
-            node = ("binop", op.value, node, right)
-        return node
-
-    def parse_factor(self):
-        node = self.parse_unary()
-        while self.current.type == "OP" and self.current.value in ("*", "/"):
-            op = self.advance()
-            right = self.parse_unary()
-            node = ("binop", op.value, node, right)
+    def parse_expression(self):
+        # Memoized by start position so a production that backtracks
+        # never parses the same expression twice
+        start = self.pos
+        hit = self._expr_memo.get(start)
+        if hit is not None:
+            self.seek(hit[1])
+            return hit[0]
+        node = self.parse_binary()
+        self._expr_memo[start] = (node, self.pos)
         return node
 
-    def parse_unary(self):
-        if self.current.type == "OP" and self.current.value in ("+", "-"):
-            op = self.advance()
-            right = self.parse_unary()
-            return ("unary", op.value, right)
-        return self.parse_primary()
+    def parse_binary(self):
+        # Operator precedence with explicit stacks: unary prefixes and
+        # open parentheses are pushed instead of recursed into, so deep
+        # nesting costs no Python frames. ops holds (precedence, text);
+        # a '(' is (0, None) and a prefix operator is (UNARY_PREC, text).
+        values = self.values
+        new_node = self.new_node
+        operands = []
+        ops = []
+        depth = 0
+
+        while True:
+            # Operand position: prefix operators and '(' until a primary
+            kind = self.kind
+            while kind == PLUS or kind == MINUS or kind == LPAREN:
+                if kind == LPAREN:
+                    ops.append(PAREN)
+                    depth += 1
+                else:
+                    ops.append((UNARY_PREC, values[self.pos]))
+                self.advance()
+                kind = self.kind
+            node = self.parse_primary()
+
+            # Operator position: close groups until a binary operator
+            while True:
+                while ops and ops[-1][0] == UNARY_PREC:
+                    node = new_node(NODE_UNARY, ops.pop()[1], node)
+                prec = BINARY_PREC[self.kind]
+                if prec:
+                    while ops and ops[-1][0] >= prec:
+                        node = new_node(NODE_BINOP, ops.pop()[1], operands.pop(), node)
+                    operands.append(node)
+                    ops.append((prec, values[self.advance()]))
+                    break
+                while ops and ops[-1] is not PAREN:
+                    node = new_node(NODE_BINOP, ops.pop()[1], operands.pop(), node)
+                if not depth:
+                    return node
+                self.expect_RPAREN(self.PHASE,
+                                   "Expected ')' after expression.",
+                                   "Ensure every '(' has a matching ')'.")
+                ops.pop()
+                depth -= 1
 
     def parse_primary(self):
-        tok = self.current
+        kind = self.kind
+        value = self.values[self.pos]
 
-        if tok.type == "NUMBER":
+        if kind == NUMBER:
             self.advance()
-            return ("num", tok.value)
+            return self.new_node(NODE_NUM, value)
 
-        if tok.type == "ID":
+        if kind == ID:
             self.advance()
-            return ("id", tok.value)
+            return self.new_node(NODE_ID, value)
 
-        if tok.type == "LPAREN":
-            self.advance()
-            expr = self.parse_expression()
-            self.expect("RPAREN", self.PHASE,
-                        "Expected ')' after expression.",
-                        "Ensure every '(' has a matching ')'.")
-            return expr
-
-        raise ParseError(
-            f"Expected expression but found '{tok.value}'",
-            tok.line, tok.column, self.PHASE,
+        raise self.error(
+            f"Expected expression but found '{value}'",
+            self.PHASE,
             "Use a valid variable, number, or '( expression )'."
         )
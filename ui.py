@@ -1,4 +1,7 @@
 # ui.py
+#
+# Can also be run with PyPy:
+#     pypy3 ui.py
 
 from gle_parser import run_gle
 
@@ -1,7 +1,18 @@
-from flask import Flask, render_template, request
+from flask import Flask, make_response, render_template, request
 import sys
 import os
 import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    dumps = json.dumps
 
 # Add parent directory to Python path so we can import gle_parser
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -16,26 +27,91 @@ from gle_parser import run_gle
 
 app = Flask(__name__)
 
+# Larger uploads are rejected with 413 before they are read
+MAX_UPLOAD_BYTES = 4 * 1024 * 1024
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+# Serialized results and rendered pages of recent uploads, keyed by a
+# 128-bit digest of the source and bounded by the total length of the
+# cached strings. Each entry is [result, AST JSON, HTML or None].
+RESULT_CACHE_BYTES = 64 * 1024 * 1024
+_result_cache = OrderedDict()
+_result_cache_bytes = 0
+_result_lock = threading.Lock()
+
+
+def analyze(code):
+    """Run the parser and return (result message, AST as JSON)."""
+    output = run_gle(code)
+
+    # Support run_gle returning either a single value or a tuple (result, ast)
+    if isinstance(output, tuple) and len(output) == 2:
+        result, ast_obj = output
+        return result, dumps(ast_obj)
+    return output, dumps({"type": "Program", "globals": [], "functions": []})
+
+
+def entry_size(entry):
+    return sum(len(text) for text in entry if text)
+
+
+def store(digest, entry):
+    # Caller holds _result_lock
+    global _result_cache_bytes
+    _result_cache[digest] = entry
+    _result_cache_bytes += entry_size(entry)
+    while _result_cache_bytes > RESULT_CACHE_BYTES:
+        _, old = _result_cache.popitem(last=False)
+        _result_cache_bytes -= entry_size(old)
+
+
+def cached_run(data):
+    """Return (digest, entry) for an upload, parsing it on a miss."""
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    with _result_lock:
+        entry = _result_cache.get(digest)
+        if entry is not None:
+            _result_cache.move_to_end(digest)
+            return digest, entry
+
+    entry = [*analyze(data.decode("utf-8")), None]
+    if entry_size(entry) <= RESULT_CACHE_BYTES // 8:
+        with _result_lock:
+            if digest not in _result_cache:
+                store(digest, entry)
+    return digest, entry
+
+
+def cache_page(digest, entry, html):
+    global _result_cache_bytes
+    if entry_size(entry) + len(html) > RESULT_CACHE_BYTES // 8:
+        return
+    with _result_lock:
+        if _result_cache.get(digest) is entry and entry[2] is None:
+            # Re-store so the page counts against the budget
+            del _result_cache[digest]
+            _result_cache_bytes -= entry_size(entry)
+            entry[2] = html
+            store(digest, entry)
+
+
 @app.route("/", methods=["GET", "POST"])
 def index():
-    result = None
-    ast_data = None
-
-    if request.method == "POST":
-        file = request.files["codefile"]
-        code = file.read().decode("utf-8")
+    if request.method != "POST":
+        return render_template("index.html", result=None, ast=None)
 
-        output = run_gle(code)
+    file = request.files["codefile"]
+    digest, entry = cached_run(file.read())
+    result, ast_data, html = entry
 
-        # Support run_gle returning either a single value or a tuple (result, ast)
-        if isinstance(output, tuple) and len(output) == 2:
-            result, ast_obj = output
-            ast_data = json.dumps(ast_obj)
-        else:
-            result = output
-            ast_data = json.dumps({"type": "Program", "globals": [], "functions": []})
+    if app.jinja_env.auto_reload:
+        # Template edits must show up immediately while debugging
+        return render_template("index.html", result=result, ast=ast_data)
 
-    return render_template("index.html", result=result, ast=ast_data)
+    if html is None:
+        html = render_template("index.html", result=result, ast=ast_data)
+        cache_page(digest, entry, html)
+    return make_response(html)
 
 if __name__ == "__main__":
     app.run(debug=True)